@@ -1,12 +1,15 @@
-import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import google.generativeai as genai
+import operator
 import os
 from typing import Optional
 
-from utils.helpers import extract_function_call_from_response, extract_text_from_response
+from utils.helpers import extract_function_call_from_response, extract_text_from_response, format_sse
+from utils.server import run_app
+from utils.cache import TTLCache, normalize_query
 
 load_dotenv()
 
@@ -22,7 +25,8 @@ genai.configure(api_key=GOOGLE_API_KEY)
 app = FastAPI(
     title="Basic Agent - Native Gemini SDK",
     version="1.0.0",
-    description="Simple agent using native Google Gemini SDK with function calling"
+    description="Simple agent using native Google Gemini SDK with function calling",
+    default_response_class=ORJSONResponse
 )
 
 # Tool definitions
@@ -58,46 +62,99 @@ TOOLS = [
 ]
 
 # Gemini expects function_declarations under a tool spec
-FUNCTION_DECLARATIONS = [
+FUNCTION_DECLARATIONS = tuple(
     {
         "name": tool["name"],
         "description": tool["description"],
         "parameters": tool["input_schema"],
     }
     for tool in TOOLS
-]
+)
+
+# Built once and shared; never mutated after import
+TOOL_SPEC = ({"function_declarations": FUNCTION_DECLARATIONS},)
+
+SYSTEM_INSTRUCTION = (
+    "You are a helpful assistant with access to tools. "
+    "Use the calculator for math operations and get_weather for weather queries. "
+    "Always provide clear and concise responses."
+)
+
+
+# Model is built once at import; tool schemas are parsed a single time
+model = genai.GenerativeModel(
+    model_name="gemini-2.5-flash",
+    tools=TOOL_SPEC,
+    system_instruction=SYSTEM_INSTRUCTION
+)
 
 
 # Tool implementations
+def _divide(x: float, y: float):
+    return x / y if y != 0 else "Error: Division by zero"
+
+
+OPERATIONS = {
+    "add": operator.add,
+    "subtract": operator.sub,
+    "multiply": operator.mul,
+    "divide": _divide,
+}
+
+# Mock weather data
+WEATHER_DB = {
+    "london": {"temp": 15, "condition": "Rainy"},
+    "paris": {"temp": 18, "condition": "Sunny"},
+    "new york": {"temp": 22, "condition": "Cloudy"}
+}
+UNKNOWN_WEATHER = {"temp": 20, "condition": "Unknown"}
+
+
 def calculator(operation: str, a: float, b: float) -> dict:
-    operations = {
-        "add": lambda x, y: x + y,
-        "subtract": lambda x, y: x - y,
-        "multiply": lambda x, y: x * y,
-        "divide": lambda x, y: x / y if y != 0 else "Error: Division by zero"
-    }
-    result = operations[operation](a, b)
-    return {"result": result}
+    return {"result": OPERATIONS[operation](a, b)}
 
 
 def get_weather(city: str) -> dict:
-    # Mock weather data
-    weather_db = {
-        "london": {"temp": 15, "condition": "Rainy"},
-        "paris": {"temp": 18, "condition": "Sunny"},
-        "new york": {"temp": 22, "condition": "Cloudy"}
-    }
-    return weather_db.get(city.lower(), {"temp": 20, "condition": "Unknown"})
+    return WEATHER_DB.get(city.lower(), UNKNOWN_WEATHER)
 
 
 # Tool router
+TOOL_REGISTRY = {
+    "calculator": calculator,
+    "get_weather": get_weather,
+}
+
+
 def execute_tool(tool_name: str, tool_input: dict) -> dict:
-    if tool_name == "calculator":
-        return calculator(**tool_input)
-    elif tool_name == "get_weather":
-        return get_weather(**tool_input)
-    else:
+    tool = TOOL_REGISTRY.get(tool_name)
+    if tool is None:
         raise ValueError(f"Unknown tool: {tool_name}")
+    return tool(**tool_input)
+
+
+# Direct answers for structured tool results (skips the follow-up model call)
+def format_tool_answer(tool_name: str, tool_input: dict, tool_result: dict) -> Optional[str]:
+    """Phrase a tool result directly, or return None when the model should word the answer"""
+    if tool_name == "calculator":
+        result = tool_result.get("result")
+        if not isinstance(result, (int, float)):
+            return None  # e.g. division by zero message
+        # 6.0 reads as 6; past 2**53 floats are not exact, so 1e300 stays 1e+300
+        if isinstance(result, float) and result.is_integer() and abs(result) < 2**53:
+            result = int(result)
+        return f"The result is {result}."
+    if tool_name == "get_weather":
+        if tool_result.get("condition") == "Unknown":
+            return None
+        return (
+            f"The weather in {tool_input.get('city')} is {tool_result['condition']} "
+            f"with a temperature of {tool_result['temp']}°C."
+        )
+    return None
+
+
+# Recently served answers, keyed by normalized query text
+response_cache = TTLCache(maxsize=1024, ttl=300)
 
 
 # Request/Response models
@@ -112,19 +169,17 @@ class AgentResponse(BaseModel):
 
 
 @app.post("/agent", response_model=AgentResponse)
-def agent_endpoint(request: QueryRequest):
-    model = genai.GenerativeModel(
-        model_name="gemini-2.5-flash",
-        tools=[{"function_declarations": FUNCTION_DECLARATIONS}],
-        system_instruction="You are a helpful assistant with access to tools. "
-                          "Use the calculator for math operations and get_weather for weather queries. "
-                          "Always provide clear and concise responses."
-    )
+async def agent_endpoint(request: QueryRequest):
+    cache_key = normalize_query(request.query)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    # Only the chat session is per-request; the model is shared
     chat = model.start_chat(history=[])
 
     # Step 1: LLM decides whether to call a tool
-    initial_response = chat.send_message(request.query)
+    initial_response = await chat.send_message_async(request.query)
 
     tool_used: Optional[str] = None
     tool_result: Optional[dict] = None
@@ -145,26 +200,83 @@ def agent_endpoint(request: QueryRequest):
                 detail=f"Tool execution failed: {str(e)}"
             )
 
-        # Step 3: Provide tool output back to the model for the final answer
-        follow_up = chat.send_message(
-            {
-                "function_response": {
-                    "name": tool_name,
-                    "response": tool_result,
+        # Step 3: Answer straight from the tool result when possible,
+        # otherwise provide tool output back to the model for the final answer
+        answer = format_tool_answer(tool_name, tool_input, tool_result)
+        if answer is None:
+            follow_up = await chat.send_message_async(
+                {
+                    "function_response": {
+                        "name": tool_name,
+                        "response": tool_result,
+                    }
                 }
-            }
-        )
-
-        answer = extract_text_from_response(follow_up) or "No response generated"
+            )
+            answer = extract_text_from_response(follow_up) or "No response generated"
     else:
         # No tool needed, direct answer
         answer = extract_text_from_response(initial_response) or "No response generated"
 
-    return AgentResponse(
+    response = AgentResponse(
         answer=answer,
         tool_used=tool_used,
         tool_result=tool_result
     )
+    response_cache.set(cache_key, response)
+    return response
+
+
+@app.post("/agent/stream")
+async def agent_stream_endpoint(request: QueryRequest):
+    """Same flow as /agent, but streams the answer as Server-Sent Events"""
+    chat = model.start_chat(history=[])
+
+    async def event_gen():
+        # Step 1: stream the first turn; it either answers directly or requests a tool
+        function_call = None
+        response = await chat.send_message_async(request.query, stream=True)
+        async for chunk in response:
+            function_call = function_call or extract_function_call_from_response(chunk)
+            text = extract_text_from_response(chunk)
+            if text:
+                yield format_sse({"delta": text})
+
+        if function_call:
+            tool_name = function_call.name
+            tool_input = dict(function_call.args or {})
+
+            # Step 2: Execute the selected tool
+            try:
+                tool_result = execute_tool(tool_name, tool_input)
+            except Exception as e:
+                yield format_sse({"error": f"Tool execution failed: {str(e)}"})
+                return
+            yield format_sse({"tool_used": tool_name, "tool_result": tool_result})
+
+            direct_answer = format_tool_answer(tool_name, tool_input, tool_result)
+            if direct_answer is not None:
+                yield format_sse({"delta": direct_answer})
+                yield format_sse({"done": True})
+                return
+
+            # Step 3: Stream the final answer built from the tool output
+            follow_up = await chat.send_message_async(
+                {
+                    "function_response": {
+                        "name": tool_name,
+                        "response": tool_result,
+                    }
+                },
+                stream=True,
+            )
+            async for chunk in follow_up:
+                text = extract_text_from_response(chunk)
+                if text:
+                    yield format_sse({"delta": text})
+
+        yield format_sse({"done": True})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
 
 
 @app.get("/health")
@@ -173,9 +285,4 @@ def health():
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "1_basic_agent:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-    )
+    run_app("1_basic_agent:app", port=8000)
@@ -1,21 +1,23 @@
 import os
 from uuid import uuid4
 from typing import Optional
-import uvicorn
 from dotenv import load_dotenv
 
 # libs
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 # lg
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 from langchain.messages import SystemMessage, HumanMessage
 from langgraph.checkpoint.memory import InMemorySaver
 
 # components
 from utils.tools import get_weather, calculator
-from utils.helpers import extract_text_from_message
+from utils.helpers import extract_text_from_message, astream_agent_text, format_sse
+from utils.server import run_app
+from utils.cache import TTLCache, normalize_query
+from utils.llm import create_llm
 
 load_dotenv()
 
@@ -29,15 +31,12 @@ if not os.getenv("GOOGLE_API_KEY"):
 app = FastAPI(
     title="LangChain Agent - Single Agent",
     version="1.0.0",
-    description="Simple LangChain agent with calculator and weather tools"
+    description="Simple LangChain agent with calculator and weather tools",
+    default_response_class=ORJSONResponse
 )
 
-# Initialize LLM
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0
-)
+# Shared model instance (pooled HTTP/2 client, response cache)
+model = create_llm()
 
 # Create agent (use prompt=... in 0.3)
 agent_executor = create_agent(
@@ -50,6 +49,10 @@ agent_executor = create_agent(
 )
 
 
+# Recently served answers, keyed by normalized query text
+response_cache = TTLCache(maxsize=1024, ttl=300)
+
+
 # Request/Response models
 class QueryRequest(BaseModel):
     query: str
@@ -61,9 +64,14 @@ class AgentResponse(BaseModel):
 
 
 @app.post("/agent", response_model=AgentResponse)
-def agent_endpoint(request: QueryRequest):
+async def agent_endpoint(request: QueryRequest):
+    cache_key = normalize_query(request.query)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        state = agent_executor.invoke(
+        state = await agent_executor.ainvoke(
             {"messages": [{"role": "user", "content": request.query}]},
             {"configurable": {"thread_id": str(uuid4())}},
         )
@@ -71,20 +79,45 @@ def agent_endpoint(request: QueryRequest):
         messages = state.get("messages", [])
         answer = extract_text_from_message(messages[-1]) if messages else ""
 
-        return AgentResponse(answer=answer, intermediate_steps=None)
+        response = AgentResponse(answer=answer, intermediate_steps=None)
+        response_cache.set(cache_key, response)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/agent/stream")
+async def agent_stream_endpoint(request: QueryRequest):
+    """Same agent as /agent, but streams the answer as Server-Sent Events"""
+    cache_key = normalize_query(request.query)
+
+    async def event_gen():
+        # Answered by /agent recently: send the stored answer in one piece
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield format_sse({"delta": cached.answer})
+            yield format_sse({"done": True})
+            return
+
+        try:
+            async for text in astream_agent_text(
+                agent_executor,
+                {"messages": [{"role": "user", "content": request.query}]},
+                {"configurable": {"thread_id": str(uuid4())}},
+            ):
+                yield format_sse({"delta": text})
+        except Exception as e:
+            yield format_sse({"error": str(e)})
+            return
+        yield format_sse({"done": True})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "2_lg_agent:app",
-        host="0.0.0.0",
-        port=8001,
-        reload=True
-    )
+    run_app("2_lg_agent:app", port=8001)
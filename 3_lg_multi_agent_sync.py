@@ -1,16 +1,14 @@
 import os
-from typing import Optional, Dict, Any
-from uuid import uuid4
+from typing import Dict, Any, TypedDict
 
 # libs
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from pydantic import BaseModel
-import uvicorn
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
 from langchain.messages import SystemMessage
-from langchain.tools import tool
+from langgraph.graph import StateGraph, START, END
 
 # components
 from utils.tools import (
@@ -29,7 +27,11 @@ from utils.tools import (
     apply_tone_guidelines,
     suggest_next_steps
 )
-from utils.helpers import extract_text_from_message
+from utils.helpers import extract_text_from_message, astream_agent_text, format_sse
+from utils.server import run_app
+from utils.llm import create_llm
+from utils.cache import TTLCache, normalize_query
+from utils.templates import render_template_response
 
 load_dotenv()
 
@@ -41,27 +43,24 @@ if not os.getenv("GOOGLE_API_KEY"):
     )
 
 app = FastAPI(
-    title="Multi-Agent System - Synchronous with Tool Dependencies",
-    version="2.0.0",
-    description="Hierarchical multi-agent system where each agent's output feeds into the next agent"
+    title="Multi-Agent System - Pipeline with Tool Dependencies",
+    version="2.1.0",
+    description="Multi-agent pipeline that runs independent steps concurrently and only waits "
+                "where a step needs another agent's output",
+    default_response_class=ORJSONResponse
 )
 
 
 # ==================== AGENTS WITH DEPENDENCIES ====================
-def create_llm():
-    """Create a configured LLM instance"""
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0.3
-    )
+# One shared model instance (and connection pool) for all six agents
+llm = create_llm(temperature=0.3)
 
 
 # ==================== STEP 1: SENTIMENT AGENT ====================
 # This agent analyzes the emotional content of the customer message
 sentiment_tools = [analyze_sentiment, classify_emotion]
 sentiment_agent = create_agent(
-    create_llm(),
+    llm,
     sentiment_tools,
     system_prompt=SystemMessage(
         content="You are a sentiment analysis expert. Analyze customer messages to understand "
@@ -71,27 +70,11 @@ sentiment_agent = create_agent(
 )
 
 
-@tool("sentiment_analysis_tool")
-def call_sentiment_agent(message: str) -> str:
-    """
-    Analyzes the sentiment and emotion of a customer message.
-    This is STEP 1 in the pipeline.
-    
-    Args:
-        message: The customer's message text
-    
-    Returns:
-        Sentiment analysis results including sentiment, emotion, and scores
-    """
-    result = sentiment_agent.invoke({"messages": [{"role": "user", "content": message}]})
-    return extract_text_from_message(result["messages"][-1])
-
-
 # ==================== STEP 2: URGENCY AGENT ====================
 # This agent determines urgency based on the message AND sentiment from Step 1
 urgency_tools = [detect_urgency]
 urgency_agent = create_agent(
-    create_llm(),
+    llm,
     urgency_tools,
     system_prompt=SystemMessage(
         content="You are an urgency detection expert. Analyze support tickets to determine "
@@ -101,61 +84,25 @@ urgency_agent = create_agent(
 )
 
 
-@tool("urgency_detection_tool")
-def call_urgency_agent(message: str, sentiment_info: str) -> str:
-    """
-    Detects urgency level based on message content and sentiment analysis.
-    This is STEP 2 - it DEPENDS on output from sentiment_analysis_tool.
-    
-    Args:
-        message: The customer's message text
-        sentiment_info: Sentiment analysis from previous step
-    
-    Returns:
-        Urgency analysis including level, priority, and escalation needs
-    """
-    combined_context = f"Message: {message}\n\nSentiment Analysis: {sentiment_info}"
-    result = urgency_agent.invoke({"messages": [{"role": "user", "content": combined_context}]})
-    return extract_text_from_message(result["messages"][-1])
-
-
 # ==================== STEP 3: KNOWLEDGE AGENT ====================
-# This agent searches knowledge base based on message AND urgency from Step 2
+# This agent searches the knowledge base based on the message
 knowledge_tools = [search_docs, find_similar_tickets, get_solution_steps]
 knowledge_agent = create_agent(
-    create_llm(),
+    llm,
     knowledge_tools,
     system_prompt=SystemMessage(
         content="You are a knowledge base expert. Search documentation, find similar past "
-                "tickets, and retrieve solution steps. Use urgency information to prioritize "
-                "the most relevant and effective solutions."
+                "tickets, and retrieve solution steps. Prioritize the most relevant and "
+                "effective solutions."
     )
 )
 
 
-@tool("knowledge_search_tool")
-def call_knowledge_agent(message: str, urgency_info: str) -> str:
-    """
-    Searches knowledge base for solutions based on message and urgency.
-    This is STEP 3 - it DEPENDS on output from urgency_detection_tool.
-    
-    Args:
-        message: The customer's message text
-        urgency_info: Urgency analysis from previous step
-    
-    Returns:
-        Relevant documentation, similar tickets, and solution steps
-    """
-    combined_context = f"Message: {message}\n\nUrgency Info: {urgency_info}\n\nPlease search for relevant solutions."
-    result = knowledge_agent.invoke({"messages": [{"role": "user", "content": combined_context}]})
-    return extract_text_from_message(result["messages"][-1])
-
-
 # ==================== STEP 4: CUSTOMER CONTEXT AGENT ====================
-# This agent fetches customer info based on customer ID and previous insights
+# This agent fetches customer info based on the customer ID
 customer_tools = [get_customer_profile, fetch_purchase_history, check_subscription_status]
 customer_agent = create_agent(
-    create_llm(),
+    llm,
     customer_tools,
     system_prompt=SystemMessage(
         content="You are a customer context specialist. Retrieve comprehensive customer "
@@ -165,29 +112,11 @@ customer_agent = create_agent(
 )
 
 
-@tool("customer_context_tool")
-def call_customer_agent(customer_id: str, knowledge_info: str) -> str:
-    """
-    Retrieves customer context based on ID and knowledge search results.
-    This is STEP 4 - it DEPENDS on output from knowledge_search_tool.
-    
-    Args:
-        customer_id: The customer's ID
-        knowledge_info: Knowledge search results from previous step
-    
-    Returns:
-        Customer profile, purchase history, and subscription details
-    """
-    combined_context = f"Customer ID: {customer_id}\n\nKnowledge Info: {knowledge_info}\n\nRetrieve full customer context."
-    result = customer_agent.invoke({"messages": [{"role": "user", "content": combined_context}]})
-    return extract_text_from_message(result["messages"][-1])
-
-
 # ==================== STEP 5: SYSTEM STATUS AGENT ====================
 # This agent checks system status to identify any ongoing issues
 status_tools = [check_service_status, get_known_issues]
 status_agent = create_agent(
-    create_llm(),
+    llm,
     status_tools,
     system_prompt=SystemMessage(
         content="You are a system status monitor. Check current service status and known issues "
@@ -196,28 +125,11 @@ status_agent = create_agent(
 )
 
 
-@tool("system_status_tool")
-def call_status_agent(customer_context: str) -> str:
-    """
-    Checks system status based on customer context and issue details.
-    This is STEP 5 - it DEPENDS on output from customer_context_tool.
-    
-    Args:
-        customer_context: Customer information from previous step
-    
-    Returns:
-        Current system status and any known issues
-    """
-    combined_context = f"Customer Context: {customer_context}\n\nCheck if there are any system issues related to this customer."
-    result = status_agent.invoke({"messages": [{"role": "user", "content": combined_context}]})
-    return extract_text_from_message(result["messages"][-1])
-
-
 # ==================== STEP 6: RESPONSE GENERATION AGENT ====================
 # This agent creates final response using ALL previous outputs
 response_tools = [generate_response, apply_tone_guidelines, suggest_next_steps]
 response_agent = create_agent(
-    create_llm(),
+    llm,
     response_tools,
     system_prompt=SystemMessage(
         content="You are a response generation expert. Create comprehensive, personalized support "
@@ -227,8 +139,68 @@ response_agent = create_agent(
 )
 
 
-@tool("response_generation_tool")
-def call_response_agent(
+# ==================== PIPELINE STEPS ====================
+# Tag on the response agent run so streaming can pick STEP 6 tokens out of the graph's events
+RESPONSE_TAG = "response_generation"
+
+
+async def run_agent(agent, content: str, config: dict = None) -> str:
+    """Invoke an agent with a single user message and return its final text"""
+    result = await agent.ainvoke({"messages": [{"role": "user", "content": content}]}, config)
+    return extract_text_from_message(result["messages"][-1])
+
+
+async def call_sentiment_agent(message: str) -> str:
+    """
+    Analyzes the sentiment and emotion of a customer message.
+    This is STEP 1 in the pipeline.
+    """
+    return await run_agent(sentiment_agent, message)
+
+
+async def call_urgency_agent(message: str, sentiment_info: str) -> str:
+    """
+    Detects urgency level based on message content and sentiment analysis.
+    This is STEP 2 - it DEPENDS on output from STEP 1.
+    """
+    combined_context = f"Message: {message}\n\nSentiment Analysis: {sentiment_info}"
+    return await run_agent(urgency_agent, combined_context)
+
+
+async def call_knowledge_agent(message: str) -> str:
+    """
+    Searches knowledge base for solutions to the customer's message.
+    This is STEP 3 - it only needs the original message.
+    """
+    combined_context = f"Message: {message}\n\nPlease search for relevant solutions."
+    return await run_agent(knowledge_agent, combined_context)
+
+
+async def call_customer_agent(customer_id: str) -> str:
+    """
+    Retrieves customer profile, purchase history, and subscription details.
+    This is STEP 4 - it only needs the customer ID.
+    """
+    combined_context = f"Customer ID: {customer_id}\n\nRetrieve full customer context."
+    return await run_agent(customer_agent, combined_context)
+
+
+async def call_status_agent(message: str) -> str:
+    """
+    Checks current system status and known issues related to the message.
+    This is STEP 5 - it only needs the original message.
+    """
+    combined_context = f"Customer Issue: {message}\n\nCheck if there are any system issues related to this issue."
+    return await run_agent(status_agent, combined_context)
+
+
+RESPONSE_INSTRUCTIONS = (
+    "Generate a comprehensive, personalized support response that addresses the customer's issue.\n"
+    "Apply appropriate tone based on sentiment and provide clear next steps based on urgency."
+)
+
+
+def build_response_prompt(
     message: str,
     sentiment_info: str,
     urgency_info: str,
@@ -237,21 +209,12 @@ def call_response_agent(
     system_status: str
 ) -> str:
     """
-    Generates final response using ALL previous agent outputs.
-    This is STEP 6 (FINAL) - it DEPENDS on ALL previous tools.
-    
-    Args:
-        message: Original customer message
-        sentiment_info: From Step 1
-        urgency_info: From Step 2
-        knowledge_info: From Step 3
-        customer_context: From Step 4
-        system_status: From Step 5
-    
-    Returns:
-        Final personalized support response
+    Builds the STEP 6 prompt from the original message and ALL previous outputs.
+    The fixed instructions come first so every request shares the same prompt
+    prefix, which Gemini can serve from its implicit prefix cache.
     """
-    full_context = f"""
+    return f"""{RESPONSE_INSTRUCTIONS}
+
 Original Message: {message}
 
 Sentiment Analysis: {sentiment_info}
@@ -263,44 +226,94 @@ Knowledge & Solutions: {knowledge_info}
 Customer Context: {customer_context}
 
 System Status: {system_status}
-
-Generate a comprehensive, personalized support response that addresses the customer's issue.
-Apply appropriate tone based on sentiment and provide clear next steps based on urgency.
 """
-    result = response_agent.invoke({"messages": [{"role": "user", "content": full_context}]})
-    return extract_text_from_message(result["messages"][-1])
 
 
-# ==================== ORCHESTRATOR AGENT ====================
-# This agent coordinates the entire pipeline
-all_tools = [
-    call_sentiment_agent,
-    call_urgency_agent,
-    call_knowledge_agent,
-    call_customer_agent,
-    call_status_agent,
-    call_response_agent
-]
-
-orchestrator_agent = create_agent(
-    create_llm(),
-    tools=all_tools,
-    system_prompt=SystemMessage(
-        content="""You are an orchestrator for a support ticket processing system.
+async def call_response_agent(message: str, **context: str) -> str:
+    """
+    Generates final response using ALL previous agent outputs.
+    This is STEP 6 (FINAL) - it DEPENDS on ALL previous steps.
+    """
+    return await run_agent(
+        response_agent,
+        build_response_prompt(message, **context),
+        {"tags": [RESPONSE_TAG]},
+    )
 
-You MUST follow this EXACT sequence to process tickets:
 
-STEP 1: Use sentiment_analysis_tool with the customer message
-STEP 2: Use urgency_detection_tool with the message AND sentiment results from Step 1
-STEP 3: Use knowledge_search_tool with the message AND urgency results from Step 2
-STEP 4: Use customer_context_tool with customer_id AND knowledge results from Step 3
-STEP 5: Use system_status_tool with customer context from Step 4
-STEP 6: Use response_generation_tool with ALL previous results (message, sentiment, urgency, knowledge, customer_context, system_status)
+# ==================== PIPELINE GRAPH ====================
+class PipelineState(TypedDict, total=False):
+    message: str
+    customer_id: str
+    sentiment_info: str
+    urgency_info: str
+    knowledge_info: str
+    customer_context: str
+    system_status: str
+    response: str
 
-Each step DEPENDS on the previous step's output. Follow this sequence exactly and pass the accumulated context forward at each step.
-"""
+
+async def sentiment_node(state: PipelineState) -> dict:
+    return {"sentiment_info": await call_sentiment_agent(state["message"])}
+
+
+async def urgency_node(state: PipelineState) -> dict:
+    return {"urgency_info": await call_urgency_agent(state["message"], state["sentiment_info"])}
+
+
+async def knowledge_node(state: PipelineState) -> dict:
+    return {"knowledge_info": await call_knowledge_agent(state["message"])}
+
+
+async def customer_node(state: PipelineState) -> dict:
+    return {"customer_context": await call_customer_agent(state["customer_id"])}
+
+
+async def status_node(state: PipelineState) -> dict:
+    return {"system_status": await call_status_agent(state["message"])}
+
+
+async def response_node(state: PipelineState) -> dict:
+    response = await call_response_agent(
+        state["message"],
+        sentiment_info=state["sentiment_info"],
+        urgency_info=state["urgency_info"],
+        knowledge_info=state["knowledge_info"],
+        customer_context=state["customer_context"],
+        system_status=state["system_status"],
     )
-)
+    return {"response": response}
+
+
+"""
+Routing is static, so it lives in graph edges instead of an LLM.
+
+    START ──→ sentiment ──→ urgency ──┐
+      ├────→ knowledge ───────────────┤
+      ├────→ customer ────────────────┼──→ response ──→ END
+      └────→ status ──────────────────┘
+
+Nodes without an edge between them run in the same superstep (concurrently);
+response waits until all four branches have written their outputs.
+"""
+pipeline_builder = StateGraph(PipelineState)
+
+pipeline_builder.add_node("sentiment", sentiment_node)
+pipeline_builder.add_node("urgency", urgency_node)
+pipeline_builder.add_node("knowledge", knowledge_node)
+pipeline_builder.add_node("customer", customer_node)
+pipeline_builder.add_node("status", status_node)
+pipeline_builder.add_node("response", response_node)
+
+pipeline_builder.add_edge(START, "sentiment")
+pipeline_builder.add_edge(START, "knowledge")
+pipeline_builder.add_edge(START, "customer")
+pipeline_builder.add_edge(START, "status")
+pipeline_builder.add_edge("sentiment", "urgency")
+pipeline_builder.add_edge(["urgency", "knowledge", "customer", "status"], "response")
+pipeline_builder.add_edge("response", END)
+
+pipeline = pipeline_builder.compile()
 
 
 # ==================== API ====================
@@ -318,54 +331,90 @@ class SupportResponse(BaseModel):
     metadata: Dict[str, Any]
 
 
+# Recently generated responses, keyed by (customer_id, normalized message)
+response_cache = TTLCache(maxsize=1024, ttl=300)
+
+
 @app.post("/support/process", response_model=SupportResponse)
-def process_ticket(request: TicketRequest):
+async def process_ticket(request: TicketRequest):
     """
-    Process a support ticket through the synchronous pipeline.
-    Each agent's output feeds into the next agent as input.
+    Process a support ticket through the pipeline.
+    Steps 1-2, 3, 4 and 5 run concurrently; step 6 waits for all of them.
     """
+    # Customer ID must match exactly; the message is compared after normalization
+    cache_key = (request.customer_id, normalize_query(request.message))
     try:
-        # Prepare the orchestration query
-        orchestration_query = f"""
-Process this support ticket through all 6 steps in sequence:
-
-Ticket ID: {request.id}
-Customer ID: {request.customer_id}
-Message: {request.message}
+        # Common ticket shapes get a pre-written reply without any agent calls
+        templated = render_template_response(request.message, request.customer_id)
+        if templated is not None:
+            template_key, final_response = templated
+            return SupportResponse(
+                ticket_id=request.id,
+                response=final_response,
+                metadata={
+                    "customer_id": request.customer_id,
+                    "processing_type": "template",
+                    "template": template_key,
+                    "steps": 0
+                }
+            )
+
+        final_response = response_cache.get(cache_key)
+        if final_response is None:
+            state = await pipeline.ainvoke(
+                {"message": request.message, "customer_id": request.customer_id}
+            )
+            final_response = state.get("response") or "No response generated"
+            response_cache.set(cache_key, final_response)
 
-Follow the exact 6-step pipeline, passing outputs forward at each step.
-"""
-        
-        # Invoke orchestrator
-        state = orchestrator_agent.invoke(
-            {"messages": [{"role": "user", "content": orchestration_query}]},
-            {"configurable": {"thread_id": str(uuid4())}},
-        )
-        
-        # Extract final response
-        messages = state.get("messages", [])
-        final_response = extract_text_from_message(messages[-1]) if messages else "No response generated"
-        
         return SupportResponse(
             ticket_id=request.id,
             response=final_response,
             metadata={
                 "customer_id": request.customer_id,
-                "processing_type": "synchronous_pipeline",
-                "steps": 6,
-                "message_count": len(messages)
+                "processing_type": "dependency_pipeline",
+                "steps": 6
             }
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/support/process/stream")
+async def process_ticket_stream(request: TicketRequest):
+    """
+    Same pipeline as /support/process, but streams the final response
+    as Server-Sent Events while STEP 6 is being generated.
+    Tokens from STEPS 1-5 are filtered out by tag.
+    """
+    templated = render_template_response(request.message, request.customer_id)
+
+    async def event_gen():
+        if templated is not None:
+            yield format_sse({"delta": templated[1]})
+            yield format_sse({"done": True, "ticket_id": request.id, "template": templated[0]})
+            return
+        try:
+            async for text in astream_agent_text(
+                pipeline,
+                {"message": request.message, "customer_id": request.customer_id},
+                tag=RESPONSE_TAG,
+            ):
+                yield format_sse({"delta": text})
+        except Exception as e:
+            yield format_sse({"error": str(e)})
+            return
+        yield format_sse({"done": True, "ticket_id": request.id})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
+
 @app.get("/health")
 def health():
     """Health check endpoint"""
     return {
         "status": "ok",
-        "system": "Multi-Agent Synchronous Pipeline",
+        "system": "Multi-Agent Dependency Pipeline",
         "agents": [
             "sentiment_agent",
             "urgency_agent", 
@@ -374,7 +423,7 @@ def health():
             "status_agent",
             "response_agent"
         ],
-        "pipeline": "Each agent depends on previous agent's output"
+        "pipeline": "Independent agents run concurrently; dependent agents wait for their inputs"
     }
 
 
@@ -382,18 +431,19 @@ def health():
 def root():
     """Root endpoint with system info"""
     return {
-        "title": "Synchronous Multi-Agent Pipeline",
-        "description": "A 6-step support ticket processing system where each tool depends on previous outputs",
+        "title": "Multi-Agent Dependency Pipeline",
+        "description": "A 6-step support ticket processing system where steps only wait for the outputs they use",
         "pipeline_steps": [
             "1. Sentiment Analysis (analyze message)",
             "2. Urgency Detection (uses sentiment + message)",
-            "3. Knowledge Search (uses urgency + message)",
-            "4. Customer Context (uses knowledge + customer_id)",
-            "5. System Status (uses customer context)",
+            "3. Knowledge Search (uses message, runs alongside 1-2)",
+            "4. Customer Context (uses customer_id, runs alongside 1-3)",
+            "5. System Status (uses message, runs alongside 1-4)",
             "6. Response Generation (uses ALL previous outputs)"
         ],
         "endpoints": {
             "/support/process": "POST - Process a support ticket",
+            "/support/process/stream": "POST - Process a support ticket, streaming the response (SSE)",
             "/health": "GET - Health check",
             "/": "GET - This info"
         }
@@ -401,9 +451,4 @@ def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "3_lg_multi_agent_sync:app",
-        host="0.0.0.0",
-        port=8001,
-        reload=True,
-    )
+    run_app("3_lg_multi_agent_sync:app", port=8001)
@@ -1,19 +1,17 @@
 import asyncio
-import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-import uvicorn
 
 from langchain.agents import create_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.messages import SystemMessage
 
 # Import tools
 from utils.tools import (
     # Sentiment tools
-    analyze_sentiment, detect_urgency, classify_emotion,
+    analyze_ticket,
     # Knowledge base tools
     search_docs, find_similar_tickets, get_solution_steps,
     # Customer context tools
@@ -23,11 +21,20 @@ from utils.tools import (
     # Response tools
     generate_response, apply_tone_guidelines, suggest_next_steps
 )
-from utils.helpers import extract_text_from_message, safe_extract_from_result
+from utils.helpers import extract_text_from_message, safe_extract_from_result, astream_agent_text, format_sse
+from utils.server import run_app
+from utils.llm import create_llm
+from utils.cache import TTLCache, normalize_query
+from utils.batching import InflightCoalescer
+from utils.templates import render_template_response
 
 load_dotenv()
 
-app = FastAPI(title="Async Multi-Agent Support System", version="1.0.0")
+app = FastAPI(
+    title="Async Multi-Agent Support System",
+    version="1.0.0",
+    default_response_class=ORJSONResponse
+)
 
 
 # ==================== PYDANTIC MODELS ====================
@@ -41,66 +48,74 @@ class TicketRequest(BaseModel):
 class SupportResponse(BaseModel):
     ticket_id: str
     response: str
-    metadata: Dict[str, str]
+    # Any: the aggregated agent outputs are passed through as-is instead of
+    # being re-validated as strings on every response
+    metadata: Dict[str, Any]
     processing_time: str
 
 
 # ==================== SPECIALIZED AGENTS ====================
 
-def create_llm():
-    """Create configured LLM instance"""
-    return ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        api_key=os.getenv("GOOGLE_API_KEY"),
-        temperature=0
-    )
-
+# One shared model instance (and connection pool) for all five agents
+llm = create_llm()
 
 # 1. Sentiment Analysis Agent
 sentiment_agent = create_agent(
-    create_llm(),
-    tools=[analyze_sentiment, detect_urgency, classify_emotion],
-    system_prompt=SystemMessage(content="Analyze customer sentiment and urgency from support messages.")
+    llm,
+    tools=[analyze_ticket],
+    system_prompt=SystemMessage(
+        content="Analyze customer sentiment and urgency from support messages. "
+                "Use analyze_ticket to get sentiment, urgency and emotion in one call."
+    )
 )
 
 # 2. Knowledge Base Agent
 kb_agent = create_agent(
-    create_llm(),
+    llm,
     tools=[search_docs, find_similar_tickets, get_solution_steps],
     system_prompt=SystemMessage(content="Search knowledge base for relevant solutions and documentation.")
 )
 
 # 3. Customer Context Agent
 context_agent = create_agent(
-    create_llm(),
+    llm,
     tools=[get_customer_profile, fetch_purchase_history, check_subscription_status],
     system_prompt=SystemMessage(content="Retrieve customer context and history.")
 )
 
 # 4. Product Status Agent
 status_agent = create_agent(
-    create_llm(),
+    llm,
     tools=[check_service_status, get_known_issues, check_outages],
     system_prompt=SystemMessage(content="Check product/service health and known issues.")
 )
 
 # 5. Response Generation Agent
 response_agent = create_agent(
-    create_llm(),
+    llm,
     tools=[generate_response, apply_tone_guidelines, suggest_next_steps],
     system_prompt=SystemMessage(content="Generate contextual, empathetic customer responses.")
 )
 
 
 # ==================== ASYNC ORCHESTRATOR ====================
-async def process_ticket_parallel(ticket: Dict[str, Any]) -> Dict[str, Any]:
+# The status check doesn't depend on the ticket, so it is coalesced across
+# concurrent tickets and its result reused for a few seconds
+STATUS_PAYLOAD = {"messages": [{"role": "user", "content": "Check current service status"}]}
+status_calls = InflightCoalescer(ttl=5)
+
+
+async def gather_ticket_context(ticket: Dict[str, Any]) -> Tuple[Dict[str, str], bool]:
     """
-    Process support ticket with parallel agent execution.
+    Run the four independent agents concurrently and aggregate their insights.
     
     Benefits of async here:
     - All agents query external APIs/databases simultaneously
     - Reduce total latency from ~15s (sequential) to ~3-4s (parallel)
     - Better resource utilization
+    
+    Returns the aggregated insights and whether any agent failed (its insight
+    is then an "... unavailable" placeholder).
     """
 
     ticket_text = ticket["message"]
@@ -121,26 +136,28 @@ async def process_ticket_parallel(ticket: Dict[str, Any]) -> Dict[str, Any]:
             "messages": [{"role": "user", "content": f"Get context for customer: {customer_id}"}]
         }),
 
-        status_agent.ainvoke({
-            "messages": [{"role": "user", "content": "Check current service status"}]
-        }),
+        # Same prompt for every ticket: concurrent tickets share one call
+        status_calls.run("service_status_v1", lambda: status_agent.ainvoke(STATUS_PAYLOAD)),
 
         return_exceptions=True  # Don't fail entire pipeline if one agent fails
     )
 
     # Unpack results and handle potential exceptions
     sentiment_result, kb_result, context_result, status_result = results
+    degraded = any(isinstance(result, Exception) for result in results)
 
     # Aggregate insights using safe extraction helper
-    aggregated_context = {
+    return {
         "sentiment": safe_extract_from_result(sentiment_result, "Sentiment analysis unavailable"),
         "solutions": safe_extract_from_result(kb_result, "Solutions unavailable"),
         "customer_context": safe_extract_from_result(context_result, "Customer context unavailable"),
         "system_status": safe_extract_from_result(status_result, "Status check unavailable"),
-    }
+    }, degraded
 
-    # Final agent synthesizes everything into a response
-    final_response = await response_agent.ainvoke({
+
+def build_response_messages(ticket_text: str, aggregated_context: Dict[str, str]) -> Dict[str, Any]:
+    """Build the response agent input from the ticket and the aggregated insights"""
+    return {
         "messages": [{
             "role": "user",
             "content": f"""
@@ -153,30 +170,100 @@ async def process_ticket_parallel(ticket: Dict[str, Any]) -> Dict[str, Any]:
             System Status: {aggregated_context['system_status']}
             """
         }]
-    })
+    }
+
+
+async def process_ticket_parallel(ticket: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+    """
+    Process support ticket with parallel agent execution.
+    Common ticket shapes are answered from a template without any agent calls.
+    
+    Returns the result and whether it was built without some agent's insight.
+    """
+    templated = render_template_response(ticket["message"], ticket["customer_id"])
+    if templated is not None:
+        template_key, response = templated
+        return {
+            "ticket_id": ticket["id"],
+            "response": response,
+            "metadata": {"template": template_key},
+            "processing_time": "instant (template, no LLM calls)"
+        }, False
+
+    aggregated_context, degraded = await gather_ticket_context(ticket)
+
+    # Final agent synthesizes everything into a response
+    final_response = await response_agent.ainvoke(
+        build_response_messages(ticket["message"], aggregated_context)
+    )
 
     return {
         "ticket_id": ticket["id"],
         "response": extract_text_from_message(final_response["messages"][-1]),
         "metadata": aggregated_context,
         "processing_time": "~3-4s (async) vs ~15s (sync)"
-    }
+    }, degraded
 
 
 # ==================== FASTAPI ENDPOINT ====================
 
+# Recently processed tickets, keyed by (customer_id, normalized message)
+response_cache = TTLCache(maxsize=1024, ttl=300)
+
+
 @app.post("/support/process")
 async def process_support_ticket(ticket: TicketRequest):
     """
     Async endpoint that handles concurrent agent execution.
     """
+    # Customer ID must match exactly; the message is compared after normalization
+    cache_key = (ticket.customer_id, normalize_query(ticket.message))
     try:
-        result = await process_ticket_parallel(ticket.dict())
-        return SupportResponse(**result)
+        result = response_cache.get(cache_key)
+        if result is None:
+            result, degraded = await process_ticket_parallel(ticket.dict())
+            # A reply built around a failed agent is not reused once it recovers
+            if not degraded:
+                response_cache.set(cache_key, result)
+        return SupportResponse(**{**result, "ticket_id": ticket.id})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/support/process/stream")
+async def process_support_ticket_stream(ticket: TicketRequest):
+    """
+    Same pipeline as /support/process, but streams the synthesized
+    response as Server-Sent Events while it is being generated.
+    """
+    ticket_data = ticket.dict()
+    templated = render_template_response(ticket_data["message"], ticket_data["customer_id"])
+    if templated is not None:
+        async def template_gen():
+            yield format_sse({"delta": templated[1]})
+            yield format_sse({"done": True, "ticket_id": ticket_data["id"], "template": templated[0]})
+
+        return StreamingResponse(template_gen(), media_type="text/event-stream")
+
+    try:
+        aggregated_context, _ = await gather_ticket_context(ticket_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def event_gen():
+        try:
+            async for text in astream_agent_text(
+                response_agent, build_response_messages(ticket_data["message"], aggregated_context)
+            ):
+                yield format_sse({"delta": text})
+        except Exception as e:
+            yield format_sse({"error": str(e)})
+            return
+        yield format_sse({"done": True, "ticket_id": ticket_data["id"]})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
+
 @app.get("/health")
 def health():
     """Health check endpoint"""
@@ -188,9 +275,4 @@ def health():
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "4_lg_multi_agent_async:app",
-        host="0.0.0.0",
-        port=8002,
-        reload=True,
-    )
+    run_app("4_lg_multi_agent_async:app", port=8002)
@@ -1,24 +1,27 @@
 import os
-import operator
+import asyncio
+import orjson
 from uuid import uuid4
-import json
-import uvicorn
 from dotenv import load_dotenv
 from typing import TypedDict, Annotated, Optional, Literal
 
 # libs
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from langchain_core.messages import AnyMessage
 
 # langchain & langgraph
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import SystemMessage, HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
 
 # components
 from utils.tools import get_weather, calculator
-from utils.helpers import extract_text_from_message
+from utils.helpers import extract_text_from_message, astream_agent_text, format_sse
+from utils.server import run_app
+from utils.cache import TTLCache, normalize_query
+from utils.llm import create_llm, to_gemini_tool, VALIDATED_TOOL_CONFIG
 
 load_dotenv()
 
@@ -32,62 +35,68 @@ if not os.getenv("GOOGLE_API_KEY"):
 app = FastAPI(
     title="LangGraph Agent - Graph-Based Architecture",
     version="1.0.0",
-    description="LangGraph agent with explicit graph structure, nodes, and edges"
+    description="LangGraph agent with explicit graph structure, nodes, and edges",
+    default_response_class=ORJSONResponse
 )
 
 
 # ==================== STATE DEFINITION ====================
 class MessagesState(TypedDict):
-    messages: Annotated[list[AnyMessage], operator.add]
+    # add_messages appends each step's new messages (deduplicated by ID)
+    messages: Annotated[list[AnyMessage], add_messages]
     llm_calls: int
 
 
 # ==================== LLM INITIALIZATION ====================
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    api_key=os.getenv("GOOGLE_API_KEY"),
-    temperature=0
-)
+# Shared model instance (pooled HTTP/2 client, response cache)
+model = create_llm()
 
-# Bind tools to the model (enables function calling)
-tools = [calculator, get_weather]
+# Bind tools to the model (enables function calling); the schemas are
+# converted to Gemini's format once here instead of on every call, and tool
+# call arguments are generated with schema-constrained decoding
+tools = (calculator, get_weather)
 tools_by_name = {tool.name: tool for tool in tools}
-model_with_tools = model.bind_tools(tools)
+TOOL_SCHEMAS = (to_gemini_tool(tools),)
+model_with_tools = model.bind(tools=list(TOOL_SCHEMAS), tool_config=VALIDATED_TOOL_CONFIG)
 
 
 # ==================== NODE FUNCTIONS ====================
-def llm_call(state: dict):
+# Built once; Gemini is stateless, so it is still sent with every call,
+# but as the same object at the head of the prompt
+SYSTEM_MESSAGE = SystemMessage(
+    content=(
+        "You are a helpful assistant with access to tools. "
+        "Use the calculator for math operations and get_weather for weather information. "
+        "Only call tools when needed."
+    )
+)
+
+
+async def llm_call(state: dict):
     """LLM decides whether to call a tool or not"""
 
     return {
-        "messages": [
-            model_with_tools.invoke(
-                [
-                    SystemMessage(
-                        content=(
-                            "You are a helpful assistant with access to tools. "
-                            "Use the calculator for math operations and get_weather for weather information. "
-                            "Only call tools when needed."
-                        )
-                    )
-                ]
-                + state["messages"]
-            )
-        ],
+        "messages": [await model_with_tools.ainvoke([SYSTEM_MESSAGE, *state["messages"]])],
         "llm_calls": state.get("llm_calls", 0) + 1
     }
 
 
-def tool_node(state: dict):
-    """Performs the tool call"""
+async def tool_node(state: dict):
+    """Performs the tool calls, running independent calls from one turn concurrently"""
+
+    tool_calls = state["messages"][-1].tool_calls
+    observations = await asyncio.gather(
+        *(tools_by_name[tool_call["name"]].ainvoke(tool_call["args"]) for tool_call in tool_calls),
+        return_exceptions=True  # One failing tool shouldn't discard the others' results
+    )
 
     result = []
-    for tool_call in state["messages"][-1].tool_calls:
-        tool = tools_by_name[tool_call["name"]]
-        observation = tool.invoke(tool_call["args"])
+    for tool_call, observation in zip(tool_calls, observations):
+        if isinstance(observation, Exception):
+            observation = f"error: {observation}"
         result.append(
             ToolMessage(
-                content=json.dumps(observation) if not isinstance(observation, str) else observation,
+                content=orjson.dumps(observation).decode() if not isinstance(observation, str) else observation,
                 tool_call_id=tool_call["id"],
             )
         )
@@ -164,8 +173,12 @@ class AgentResponse(BaseModel):
 
 
 # ==================== API ENDPOINTS ====================
+# Recently served answers, keyed by normalized query text
+response_cache = TTLCache(maxsize=1024, ttl=300)
+
+
 @app.post("/agent", response_model=AgentResponse)
-def agent_endpoint(request: QueryRequest):
+async def agent_endpoint(request: QueryRequest):
     """
     Process a query through the LangGraph agent.
     
@@ -176,6 +189,11 @@ def agent_endpoint(request: QueryRequest):
     4. Loop until a final answer is ready
     5. Return the complete response
     """
+    cache_key = normalize_query(request.query)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
         # Create initial state with user message
         initial_state = {
@@ -187,24 +205,61 @@ def agent_endpoint(request: QueryRequest):
         config = {"configurable": {"thread_id": str(uuid4())}}
 
         # Invoke the graph - it will run until reaching END
-        final_state = agent.invoke(initial_state, config)
+        final_state = await agent.ainvoke(initial_state, config)
+        messages = final_state.get("messages", [])
 
         # Extract the final answer from the last message
-        messages = final_state.get("messages", [])
         answer = extract_text_from_message(messages[-1]) if messages else "No response generated"
 
         # Count the number of steps (messages) in the conversation
         graph_steps = len(messages)
 
-        return AgentResponse(
+        response = AgentResponse(
             answer=answer,
             intermediate_steps=None,
             graph_steps=graph_steps
         )
+        response_cache.set(cache_key, response)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/agent/stream")
+async def agent_stream_endpoint(request: QueryRequest):
+    """
+    Same graph as /agent, but streams the answer as Server-Sent Events
+    while the LLM generates it. Tool calls still run between LLM steps.
+    """
+    cache_key = normalize_query(request.query)
+
+    async def event_gen():
+        # Answered recently by either endpoint: send the stored answer in one piece
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield format_sse({"delta": cached.answer})
+            yield format_sse({"done": True})
+            return
+
+        chunks = []
+        try:
+            async for text in astream_agent_text(
+                agent,
+                {"messages": [HumanMessage(content=request.query)], "llm_calls": 0},
+                {"configurable": {"thread_id": str(uuid4())}},
+            ):
+                chunks.append(text)
+                yield format_sse({"delta": text})
+        except Exception as e:
+            yield format_sse({"error": str(e)})
+            return
+        # Only a completed stream is reused, by either endpoint
+        response_cache.set(cache_key, AgentResponse(answer="".join(chunks) or "No response generated"))
+        yield format_sse({"done": True})
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream")
+
+
 @app.get("/health")
 def health():
     """Health check endpoint"""
@@ -231,6 +286,7 @@ def root():
         ],
         "endpoints": {
             "POST /agent": "Send a query to the agent",
+            "POST /agent/stream": "Send a query, streaming the answer (SSE)",
             "GET /health": "Health check",
             "GET /graph-info": "Detailed graph structure information",
             "GET /": "This information"
@@ -244,9 +300,4 @@ def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "5_lgraph_agent:app",
-        host="0.0.0.0",
-        port=8003,
-        reload=True
-    )
+    run_app("5_lgraph_agent:app", port=8003)
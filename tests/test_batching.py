@@ -0,0 +1,96 @@
+import asyncio
+import unittest
+
+from utils.batching import InflightCoalescer
+
+
+class InflightCoalescerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_call(self):
+        coalescer = InflightCoalescer(ttl=5)
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "status ok"
+
+        callers = [asyncio.create_task(coalescer.run("status", fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await asyncio.gather(*callers), ["status ok"] * 5)
+        self.assertEqual(calls, 1)
+
+        # Reused within the TTL
+        self.assertEqual(await coalescer.run("status", fetch), "status ok")
+        self.assertEqual(calls, 1)
+
+    async def test_keys_are_independent(self):
+        coalescer = InflightCoalescer(ttl=5)
+
+        async def echo(value):
+            return value
+
+        results = await asyncio.gather(
+            coalescer.run("a", lambda: echo("a")),
+            coalescer.run("b", lambda: echo("b")),
+        )
+        self.assertEqual(results, ["a", "b"])
+
+    async def test_exceptions_are_shared_but_not_cached(self):
+        coalescer = InflightCoalescer(ttl=5)
+        calls = 0
+
+        async def flaky():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            if calls == 1:
+                raise RuntimeError("upstream down")
+            return "recovered"
+
+        results = await asyncio.gather(
+            coalescer.run("status", flaky),
+            coalescer.run("status", flaky),
+            return_exceptions=True,
+        )
+        self.assertEqual([type(result) for result in results], [RuntimeError, RuntimeError])
+        self.assertEqual(calls, 1)
+
+        self.assertEqual(await coalescer.run("status", flaky), "recovered")
+        self.assertEqual(calls, 2)
+
+    async def test_cancelled_caller_does_not_cancel_the_shared_call(self):
+        coalescer = InflightCoalescer(ttl=5)
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "status ok"
+
+        first = asyncio.create_task(coalescer.run("status", fetch))
+        second = asyncio.create_task(coalescer.run("status", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, "status ok")
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_results_expire_after_ttl(self):
+        coalescer = InflightCoalescer(ttl=0.01)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        self.assertEqual(await coalescer.run("status", fetch), 1)
+        await asyncio.sleep(0.02)
+        self.assertEqual(await coalescer.run("status", fetch), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
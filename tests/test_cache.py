@@ -0,0 +1,95 @@
+import unittest
+from unittest import mock
+
+from utils.cache import TTLCache, normalize_query, ttl_cached
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class NormalizeQueryTest(unittest.TestCase):
+    def test_trivial_differences_share_a_key(self):
+        self.assertEqual(normalize_query("  What is 2 + 2? "), "what is 2 + 2")
+        self.assertEqual(normalize_query("WEATHER in   Paris."), "weather in paris")
+
+    def test_exclamation_mark_is_kept(self):
+        self.assertNotEqual(normalize_query("what is 5!"), normalize_query("what is 5"))
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("utils.cache.time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.evicted = []
+
+    def make_cache(self, **kwargs) -> TTLCache:
+        return TTLCache(on_evict=lambda key, value: self.evicted.append((key, value)), **kwargs)
+
+    def test_entries_expire_after_ttl(self):
+        cache = self.make_cache(ttl=10)
+        cache.set("a", 1)
+        self.clock.now += 10
+        self.assertEqual(cache.get("a"), 1)
+        self.clock.now += 0.1
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(self.evicted, [("a", 1)])
+
+    def test_least_recently_used_entry_is_evicted_when_full(self):
+        cache = self.make_cache(maxsize=2, ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(self.evicted, [("b", 2)])
+
+    def test_overwrite_evicts_only_a_replaced_value(self):
+        cache = self.make_cache(ttl=10)
+        value = object()
+        cache.set("a", value)
+        cache.set("a", value)
+        self.assertEqual(self.evicted, [])
+        cache.set("a", 2)
+        self.assertEqual(self.evicted, [("a", value)])
+
+    def test_clear_evicts_everything(self):
+        cache = self.make_cache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(self.evicted, [("a", 1), ("b", 2)])
+
+
+class TTLCachedTest(unittest.TestCase):
+    def test_results_are_reused_until_they_expire(self):
+        clock = FakeClock()
+        calls = []
+
+        @ttl_cached(ttl=5)
+        def lookup(key):
+            calls.append(key)
+            return len(calls)
+
+        with mock.patch("utils.cache.time", clock):
+            self.assertEqual(lookup("x"), 1)
+            self.assertEqual(lookup("x"), 1)
+            self.assertEqual(lookup("y"), 2)
+            clock.now += 6
+            self.assertEqual(lookup("x"), 3)
+            lookup.cache_clear()
+            self.assertEqual(lookup("y"), 4)
+        self.assertEqual(calls, ["x", "y", "x", "y"])
+
+
+if __name__ == "__main__":
+    unittest.main()
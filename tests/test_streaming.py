@@ -0,0 +1,31 @@
+import asyncio
+import itertools
+import unittest
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils.helpers import astream_agent_text
+from utils.llm_cache import TTLLLMCache
+
+
+class AstreamAgentTextTest(unittest.TestCase):
+    def test_repeated_request_streams_cached_answer(self):
+        model = GenericFakeChatModel(
+            messages=itertools.repeat(AIMessage(content="hello there world")),
+            cache=TTLLLMCache(),
+        )
+        agent = create_agent(model, tools=[])
+        inputs = {"messages": [HumanMessage("hi")]}
+
+        async def collect():
+            return "".join([text async for text in astream_agent_text(agent, inputs)])
+
+        # The second request is answered from the LLM cache without token events
+        self.assertEqual(asyncio.run(collect()), "hello there world")
+        self.assertEqual(asyncio.run(collect()), "hello there world")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+
+from utils.templates import render_template_response, ticket_fingerprint
+
+
+class TicketFingerprintTest(unittest.TestCase):
+    def test_known_issue_symptoms_match(self):
+        cases = {
+            "The dashboard is really slow on my phone": "I-101",
+            "My dashboard won't load since this morning": "I-101",
+            "Email notifications are delayed by hours": "I-102",
+            "Order notifications arrive hours late": "I-102",
+        }
+        for message, issue_id in cases.items():
+            with self.subTest(message=message):
+                fingerprint = ticket_fingerprint(message)
+                self.assertIsNotNone(fingerprint)
+                self.assertEqual(fingerprint[2:], ("known_issue", issue_id))
+
+    def test_topic_failures_match(self):
+        cases = {
+            "I can't log in to my account": "login",
+            "I’m locked out after the update": "login",
+            "My password keeps being rejected": "login",
+            "My payment was declined twice today": "payment",
+            "I was charged twice for my subscription": "payment",
+            "I can't complete the payment at checkout": "payment",
+        }
+        for message, topic in cases.items():
+            with self.subTest(message=message):
+                fingerprint = ticket_fingerprint(message)
+                self.assertIsNotNone(fingerprint)
+                self.assertEqual(fingerprint[2], topic)
+
+    def test_other_problems_go_to_the_agents(self):
+        messages = [
+            "I can't find the export button on the dashboard",
+            "My notifications go to the wrong email address",
+            "the dashboard shows the wrong currency",
+            "I tried to add a second card but the page shows an error",
+            "I can't change my password requirements in the admin settings",
+            "How do I turn off notifications?",
+            "How do I change my password?",
+            "Please discard my draft, it has a problem",
+        ]
+        for message in messages:
+            with self.subTest(message=message):
+                self.assertIsNone(ticket_fingerprint(message))
+                self.assertIsNone(render_template_response(message, "C001"))
+
+    def test_template_is_personalized(self):
+        key, response = render_template_response("I can't log in to my account", "C001")
+        self.assertTrue(key.endswith("/login"))
+        self.assertIn("John Doe", response)
+        self.assertIn("1. Clear browser cache and cookies", response)
+
+
+if __name__ == "__main__":
+    unittest.main()
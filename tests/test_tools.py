@@ -0,0 +1,59 @@
+import time
+import unittest
+
+from utils.tools import advanced_calculator, search_docs
+
+
+def calculate(expression: str) -> dict:
+    return advanced_calculator.func(expression)
+
+
+class AdvancedCalculatorTest(unittest.TestCase):
+    def test_arithmetic(self):
+        self.assertEqual(calculate("2**3 + 5*4"), {"result": 28})
+        self.assertEqual(calculate("round(123456, -2)"), {"result": 123500})
+        self.assertEqual(calculate("abs(-7) // 2"), {"result": 3})
+
+    def test_rejects_unsupported_syntax(self):
+        for expression in ("__import__('os')", "(1).real", "'a' * 3", "[1, 2]"):
+            with self.subTest(expression=expression):
+                self.assertIn("error", calculate(expression))
+
+    def test_oversized_results_are_rejected_quickly(self):
+        expressions = (
+            "9**9**9",
+            "((9**100)**100)**100",
+            "2**(2**(2**5))",
+            "(10**1000) * (10**1000) * (10**1000)",
+            "round(5, -10**7)",
+            "round(5, -10**8)",
+            "round(5, 10**8)",
+        )
+        for expression in expressions:
+            with self.subTest(expression=expression):
+                start = time.perf_counter()
+                self.assertIn("error", calculate(expression))
+                self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_round_ndigits_must_be_a_bounded_integer(self):
+        self.assertEqual(calculate("round(5, -1000)"), {"result": 0})
+        self.assertIn("error", calculate("round(5, -1001)"))
+        self.assertIn("error", calculate("round(5, 2.5)"))
+
+
+class SearchDocsTest(unittest.TestCase):
+    def titles(self, query: str) -> list:
+        return [doc["title"] for doc in search_docs.func(query)["results"]]
+
+    def test_matches_topic_keywords(self):
+        self.assertEqual(self.titles("My card was charged twice"), ["Payment Problems"])
+        self.assertEqual(self.titles("The app crashed on startup"), ["Report a Bug"])
+
+    def test_common_words_do_not_match(self):
+        self.assertEqual(self.titles("I have a question about my login"), ["Login Issues"])
+        self.assertEqual(self.titles("I have login problems"), ["Login Issues"])
+        self.assertEqual(search_docs.func("What are your opening hours")["total_found"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
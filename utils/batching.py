@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from utils.cache import TTLCache
+
+_MISSING = object()
+
+
+class InflightCoalescer:
+    """
+    Share one in-flight call between concurrent callers with the same key.
+    
+    The first caller for a key starts `factory()`; anyone asking for the same
+    key while it runs awaits the same future instead of issuing a duplicate
+    call. Successful results are then reused for `ttl` seconds.
+    
+    Only use it for calls whose result does not depend on the caller, such
+    as a fixed "check service status" prompt.
+    
+    Example:
+        >>> status = InflightCoalescer(ttl=5)
+        >>> result = await status.run("service_status_v1", lambda: agent.ainvoke(payload))
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._results = TTLCache(maxsize=256, ttl=ttl)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the result for `key`, starting `factory()` only if no call is running or cached"""
+        cached = self._results.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+
+        # Shield so one cancelled caller doesn't cancel the call for the others
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._results.set(key, future.result())
@@ -0,0 +1,133 @@
+import functools
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize free text so trivially different phrasings share a cache key.
+    
+    Collapses whitespace, drops a trailing "?" or "." and casefolds. A
+    trailing "!" is kept, since "what is 5!" is a factorial.
+    
+    Args:
+        text: User query or ticket message
+        
+    Returns:
+        str: Normalized text
+        
+    Examples:
+        - "  What is 2 + 2? " -> "what is 2 + 2"
+        - "WEATHER in   Paris." -> "weather in paris"
+    """
+    return _WHITESPACE_RE.sub(" ", text).strip().rstrip("?.").rstrip().casefold()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process LRU cache whose entries expire after `ttl` seconds.
+    
+    Used to short-circuit repeated agent requests and tool calls. For a
+    multi-process deployment, swap it for a shared backend such as Redis
+    with the same get/set interface.
+    
+    `on_evict(key, value)` is called, outside the lock, for every value that
+    leaves the cache (expired, evicted, overwritten or cleared), so values
+    holding external resources can release them.
+    
+    Example:
+        >>> cache = TTLCache(maxsize=128, ttl=60)
+        >>> cache.set("what is 2 + 2", {"answer": "4"})
+        >>> cache.get("what is 2 + 2")
+        {'answer': '4'}
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 300.0,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for `key`, or `default` if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at >= time.monotonic():
+                self._data.move_to_end(key)
+                return value
+            del self._data[key]
+        self._evicted([(key, value)])
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry when full"""
+        evicted = []
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and old[1] is not value:
+                evicted.append((key, old[1]))
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                old_key, (_, old_value) = self._data.popitem(last=False)
+                evicted.append((old_key, old_value))
+        self._evicted(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            evicted = [(key, value) for key, (_, value) in self._data.items()]
+            self._data.clear()
+        self._evicted(evicted)
+
+    def _evicted(self, items: list) -> None:
+        if self.on_evict is not None:
+            for key, value in items:
+                self.on_evict(key, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+def ttl_cached(ttl: float, maxsize: int = 128) -> Callable:
+    """
+    Memoize a function with positional, hashable arguments for `ttl` seconds.
+    
+    Like functools.lru_cache, but entries expire, so it suits lookups whose
+    answer can change (service status, external APIs).
+    
+    Example:
+        >>> @ttl_cached(ttl=60)
+        ... def service_status() -> dict:
+        ...     return fetch_status()
+    """
+    def decorator(func: Callable) -> Callable:
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            result = cache.get(args, _MISSING)
+            if result is _MISSING:
+                result = func(*args)
+                cache.set(args, result)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -1,3 +1,15 @@
+import orjson
+
+__all__ = [
+    "extract_text_from_message",
+    "safe_extract_from_result",
+    "extract_function_call_from_response",
+    "extract_text_from_response",
+    "format_sse",
+    "astream_agent_text",
+]
+
+
 def extract_text_from_message(message) -> str:
     """
     Safely extract text content from a message.
@@ -16,19 +28,17 @@ def extract_text_from_message(message) -> str:
     """
     content = message.content
     
-    # If content is already a string, return it
-    if isinstance(content, str):
+    # Fast path: almost every Gemini message carries plain string content
+    if content.__class__ is str:
         return content
     
     # If content is a list of parts, extract text from text parts
     if isinstance(content, list):
-        text_parts = []
-        for part in content:
-            if isinstance(part, dict) and part.get("type") == "text":
-                text_parts.append(part.get("text", ""))
-            elif hasattr(part, "type") and part.type == "text":
-                text_parts.append(getattr(part, "text", ""))
-        return " ".join(text_parts)
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else getattr(part, "text", "")
+            for part in content
+            if (part.get("type") if isinstance(part, dict) else getattr(part, "type", None)) == "text"
+        )
     
     # Fallback: try to convert to string
     return str(content) if content else ""
@@ -82,15 +92,15 @@ def extract_function_call_from_response(response):
         >>> if func_call:
         ...     print(func_call.name, func_call.args)
     """
-    return next(
-        (
-            part.function_call
-            for candidate in response.candidates or []
-            for part in (candidate.content.parts if candidate.content else [])
-            if getattr(part, "function_call", None)
-        ),
-        None,
-    )
+    for candidate in response.candidates or ():
+        content = candidate.content
+        if not content:
+            continue
+        for part in content.parts:
+            function_call = getattr(part, "function_call", None)
+            if function_call:
+                return function_call
+    return None
 
 
 def extract_text_from_response(response):
@@ -111,12 +121,68 @@ def extract_text_from_response(response):
         >>> print(text)
         "Hi! How can I help you?"
     """
-    return next(
-        (
-            part.text
-            for candidate in response.candidates or []
-            for part in (candidate.content.parts if candidate.content else [])
-            if getattr(part, "text", None)
-        ),
-        None,
-    )
+    for candidate in response.candidates or ():
+        content = candidate.content
+        if not content:
+            continue
+        for part in content.parts:
+            text = getattr(part, "text", None)
+            if text:
+                return text
+    return None
+
+
+# ==================== STREAMING HELPERS ====================
+
+def format_sse(data: dict) -> str:
+    """
+    Format a payload as a single Server-Sent Events message.
+    
+    The payload is JSON-encoded (with orjson, like the JSON responses) so
+    newlines inside generated text cannot break the event framing.
+    
+    Args:
+        data: JSON-serializable payload
+        
+    Returns:
+        str: SSE message ready to be yielded from a StreamingResponse
+        
+    Example:
+        >>> format_sse({"delta": "Hello"})
+        'data: {"delta":"Hello"}\\n\\n'
+    """
+    return f"data: {orjson.dumps(data).decode()}\n\n"
+
+
+async def astream_agent_text(agent, inputs: dict, config: dict = None, tag: str = None):
+    """
+    Stream text tokens produced by an agent's chat model as they are generated.
+    
+    Tool-call chunks carry no text and are skipped, so only the
+    user-facing answer is yielded. A model call answered from the LLM cache
+    emits no token events, so its whole text is yielded at once when it ends.
+    
+    Args:
+        agent: A LangChain/LangGraph runnable (e.g. from create_agent)
+        inputs: Agent input, e.g. {"messages": [...]}
+        config: Optional runnable config (thread_id, tags, ...)
+        tag: Only forward tokens from runs carrying this tag
+            (useful when a graph runs several agents)
+        
+    Yields:
+        str: Non-empty text deltas
+    """
+    streamed_runs = set()
+    async for event in agent.astream_events(inputs, config, version="v2"):
+        if tag and tag not in event.get("tags", ()):
+            continue
+        kind = event["event"]
+        if kind == "on_chat_model_stream":
+            text = extract_text_from_message(event["data"]["chunk"])
+            if text:
+                streamed_runs.add(event["run_id"])
+                yield text
+        elif kind == "on_chat_model_end" and event["run_id"] not in streamed_runs:
+            text = extract_text_from_message(event["data"]["output"])
+            if text:
+                yield text
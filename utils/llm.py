@@ -0,0 +1,155 @@
+import asyncio
+import atexit
+import os
+from functools import lru_cache
+from typing import Sequence
+
+import httpx
+from google.genai import Client
+from google.genai.types import (
+    FunctionCallingConfig,
+    FunctionCallingConfigMode,
+    FunctionDeclaration,
+    HttpOptions,
+    Tool,
+    ToolConfig,
+)
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_google_genai._common import get_user_agent
+from pydantic import SecretStr, model_validator
+from typing_extensions import Self
+
+from utils.llm_cache import TTLLLMCache
+
+# One large keep-alive pool with HTTP/2, so concurrent agent calls reuse
+# connections instead of renegotiating TLS
+HTTP_CLIENT_ARGS = {
+    "limits": httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    "http2": True,
+}
+
+# Process-wide HTTP clients shared by every model instance (all temperatures).
+# Request timeouts are set per call by the model, not here.
+HTTP_CLIENT = httpx.Client(**HTTP_CLIENT_ARGS)
+ASYNC_HTTP_CLIENT = httpx.AsyncClient(**HTTP_CLIENT_ARGS)
+
+
+@atexit.register
+def _close_http_clients() -> None:
+    # google-genai never closes clients it was handed, so close them here
+    HTTP_CLIENT.close()
+    try:
+        asyncio.run(ASYNC_HTTP_CLIENT.aclose())
+    except Exception:
+        # Pooled connections may belong to an event loop that is already closed
+        pass
+
+
+# Function calling with constrained decoding: the model may still answer in
+# plain text, but any function call it emits is decoded against the tool's
+# JSON schema, so malformed arguments can't come back
+VALIDATED_TOOL_CONFIG = ToolConfig(
+    function_calling_config=FunctionCallingConfig(mode=FunctionCallingConfigMode.VALIDATED)
+)
+
+# Shared by every model: identical (model, messages, tools) requests within
+# the TTL are answered without calling Gemini
+LLM_RESPONSE_CACHE = TTLLLMCache(maxsize=2048, ttl=600)
+
+
+class PooledChatGoogleGenerativeAI(ChatGoogleGenerativeAI):
+    """
+    ChatGoogleGenerativeAI that sends every request through the shared HTTP clients.
+    
+    The stock model builds its own google-genai client (and connection pools)
+    per instance; this rebuilds it on top of HTTP_CLIENT / ASYNC_HTTP_CLIENT,
+    keeping the base URL and headers. Vertex AI / credentials setups and
+    custom `client_args` keep the stock client.
+    Passing an explicit async client also keeps google-genai on httpx (HTTP/2)
+    instead of switching to aiohttp when that happens to be installed.
+    """
+
+    @model_validator(mode="after")
+    def _use_shared_http_clients(self) -> Self:
+        # Vertex AI / explicit credentials and custom client_args keep the
+        # client the parent built; only the API-key path is pooled
+        if getattr(self, "_use_vertexai", False) or self.credentials or self.client_args:
+            return self
+
+        # Same base URL and headers (incl. LangChain's User-Agent) the parent
+        # configured; only the transport is swapped for the shared clients
+        base_url = self.base_url
+        if isinstance(base_url, dict):
+            base_url = base_url["api_endpoint"]
+        _, user_agent = get_user_agent("ChatGoogleGenerativeAI")
+        api_key = self.google_api_key
+        if isinstance(api_key, SecretStr):
+            api_key = api_key.get_secret_value()
+
+        self.client.close()
+        self.client = Client(
+            api_key=api_key,
+            http_options=HttpOptions(
+                base_url=base_url,
+                headers={"User-Agent": user_agent, **(self.additional_headers or {})},
+                httpx_client=HTTP_CLIENT,
+                httpx_async_client=ASYNC_HTTP_CLIENT,
+            ),
+        )
+        return self
+
+
+@lru_cache(maxsize=None)
+def create_llm(temperature: float = 0) -> ChatGoogleGenerativeAI:
+    """
+    Return the shared Gemini chat model for a given temperature.
+    
+    The instance is created once and reused by every agent; tool binding
+    happens per agent and does not copy it. All instances share one HTTP
+    connection pool, and responses go through the shared LLM_RESPONSE_CACHE.
+    
+    Args:
+        temperature: Sampling temperature
+    
+    Returns:
+        ChatGoogleGenerativeAI: Cached model instance
+    """
+    return PooledChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=temperature,
+        timeout=60,
+        cache=LLM_RESPONSE_CACHE,
+    )
+
+
+def to_gemini_tool(tools: Sequence[BaseTool]) -> Tool:
+    """
+    Convert LangChain tools into a single google-genai Tool, once.
+    
+    bind_tools stores OpenAI-style dicts that ChatGoogleGenerativeAI converts
+    into google-genai objects again on every call; binding the converted Tool
+    with `model.bind(tools=[...])` makes that per-call step a pass-through.
+    
+    Args:
+        tools: LangChain tools
+        
+    Returns:
+        Tool: One Tool holding a function declaration per tool
+        
+    Example:
+        >>> model_with_tools = create_llm().bind(
+        ...     tools=[to_gemini_tool([calculator])], tool_config=VALIDATED_TOOL_CONFIG
+        ... )
+    """
+    functions = [convert_to_openai_tool(t)["function"] for t in tools]
+    return Tool(function_declarations=[
+        FunctionDeclaration(
+            name=f["name"],
+            description=f.get("description", ""),
+            parameters_json_schema=f["parameters"],
+        )
+        for f in functions
+    ])
@@ -0,0 +1,57 @@
+import hashlib
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+
+from utils.cache import TTLCache
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """
+    Hash a serialized chat request into a fixed-size cache key.
+
+    Args:
+        prompt: LangChain's serialization of the messages
+        llm_string: LangChain's serialization of the model config, which
+            includes the model name, temperature and any bound tools
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode()).hexdigest()
+
+
+class TTLLLMCache(BaseCache):
+    """
+    LangChain chat model cache backed by the in-process TTLCache.
+
+    Pass it as `cache=` to a chat model and identical (model, messages, tools)
+    requests are answered with the stored generations instead of calling the
+    API again. Keys are SHA-256 digests, so long prompts don't sit in memory
+    twice.
+
+    Example:
+        >>> llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", cache=TTLLLMCache())
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self._cache.get(cache_key(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._cache.set(cache_key(prompt, llm_string), return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._cache.clear()
+
+    # In-memory lookups are cheap; skip the default run-in-executor round trip
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import uvicorn
+
+# uvloop (libuv-based event loop) is not available on Windows
+EVENT_LOOP = "asyncio" if sys.platform == "win32" else "uvloop"
+
+
+def run_app(app: str, port: int) -> None:
+    """
+    Run one of the FastAPI apps with uvicorn.
+    
+    Auto-reload spawns a file-watching supervisor process and is only
+    meant for development, so it is enabled only when DEV is set.
+    Connections are kept alive between requests and parsed with httptools,
+    and the event loop is uvloop wherever it is available.
+    
+    Args:
+        app: Import string of the app, e.g. "1_basic_agent:app"
+        port: Port to listen on
+        
+    Example:
+        $ DEV=1 python 1_basic_agent.py   # auto-reload on file changes
+    """
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        reload=bool(os.getenv("DEV")),
+        http="httptools",
+        loop=EVENT_LOOP,
+        timeout_keep_alive=30,
+    )
@@ -0,0 +1,139 @@
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import yaml
+
+from utils.tools import (
+    analyze_sentiment,
+    detect_urgency,
+    get_solution_steps,
+    get_customer_profile,
+    get_known_issues,
+)
+
+TEMPLATES_PATH = Path(__file__).with_name("response_templates.yml")
+
+# Loaded once at import; keys look like "negative/high/login"
+with TEMPLATES_PATH.open(encoding="utf-8") as f:
+    RESPONSE_TEMPLATES: Dict[str, str] = yaml.safe_load(f)
+
+# A ticket only gets a canned reply when it describes the failure that reply
+# is written for. Mentioning a topic next to any problem word is not enough:
+# "the dashboard shows the wrong currency" or "can't change my password
+# requirements" are questions for the agents, not a known issue or a lockout.
+
+# Known issues match on their symptom: every pattern must be found
+KNOWN_ISSUE_PATTERNS = (
+    # I-101 "Slow dashboard loading on mobile"
+    ("I-101", (
+        re.compile(r"\bdashboards?\b"),
+        re.compile(
+            r"\b(?:slow(?:ly|er)?|lag(?:s|gy|ging)?|takes? forever|(?:keeps|stuck) loading"
+            r"|(?:won't|doesn't|does not|not|never) load(?:ing)?|loading (?:forever|slowly))\b"
+        ),
+    )),
+    # I-102 "Email notifications delayed"
+    ("I-102", (
+        re.compile(r"\bnotifications?\b"),
+        re.compile(
+            r"\b(?:delay(?:s|ed)?|hours later"
+            r"|(?:is|are|was|were|arrive[sd]?|arriving|comes?|coming|shows? up|showing up) (?:hours )?late"
+            r"|(?:not|never|haven't|didn't) (?:arrive[sd]?|arriving|come through|coming through))\b"
+        ),
+    )),
+)
+
+# Failure phrases specific to each topic with canned solution steps
+TOPIC_PATTERNS = (
+    ("login", re.compile(
+        r"\b(?:(?:can't|cannot|cant|unable to|won't let me|doesn't let me|not able to)"
+        r" (?:log ?in|login|sign ?in|access my account|get into my account)"
+        r"|locked out"
+        r"|(?:login|log in|sign in|password)s? (?:(?:is|was|keeps|keeps being) )?"
+        r"(?:fails?|failed|failing|rejected|not working|doesn't work|isn't working|invalid|incorrect)"
+        r"|(?:forgot|forgotten|lost) (?:my )?password)\b"
+    )),
+    ("payment", re.compile(
+        r"\b(?:(?:payments?|cards?|charges?|transactions?) (?:(?:is|was|were|got|keeps|keeps getting|keeps being) )?"
+        r"(?:declined|failed|fails|failing|rejected|bounced|didn't go through|won't go through|doesn't go through|not going through)"
+        r"|(?:can't|cannot|cant|unable to|not able to) (?:pay|make (?:a |the |my )?payments?|complete (?:a |the |my )?payments?|check ?out)"
+        r"|(?:charged|billed) twice|double[- ]charged"
+        r"|(?:payment|card|billing) error)\b"
+    )),
+)
+
+
+def ticket_fingerprint(message: str) -> Optional[Tuple[str, str, str, Optional[str]]]:
+    """
+    Compute the coarse (sentiment, urgency, topic) shape of a ticket.
+
+    Uses the same deterministic tools the agents call, so no LLM is involved.
+
+    Args:
+        message: Customer message text
+
+    Returns:
+        Optional[Tuple]: (sentiment, urgency, topic, known_issue_id), or None
+        if the message doesn't describe a failure that has templates
+    """
+    # Curly apostrophes from mobile keyboards read like typed ones
+    message_lower = message.lower().replace("\u2019", "'")
+
+    known_issue_id = next(
+        (
+            issue_id for issue_id, patterns in KNOWN_ISSUE_PATTERNS
+            if all(pattern.search(message_lower) for pattern in patterns)
+        ),
+        None
+    )
+    if known_issue_id:
+        topic = "known_issue"
+    else:
+        topic = next(
+            (name for name, pattern in TOPIC_PATTERNS if pattern.search(message_lower)),
+            None
+        )
+        if topic is None:
+            return None
+
+    sentiment = analyze_sentiment.func(message)["sentiment"]
+    urgency = detect_urgency.func(message)["urgency_level"]
+    return sentiment, urgency, topic, known_issue_id
+
+
+def render_template_response(message: str, customer_id: str) -> Optional[Tuple[str, str]]:
+    """
+    Render a pre-written response for a common ticket shape.
+
+    Args:
+        message: Customer message text
+        customer_id: Customer ID used to personalize the greeting
+
+    Returns:
+        Optional[Tuple[str, str]]: (template key, response text), or None when
+        the ticket is novel and needs the response agent
+    """
+    fingerprint = ticket_fingerprint(message)
+    if fingerprint is None:
+        return None
+
+    sentiment, urgency, topic, known_issue_id = fingerprint
+    key = f"{sentiment}/{urgency}/{topic}"
+    template = RESPONSE_TEMPLATES.get(key)
+    if template is None:
+        return None
+
+    solution = get_solution_steps.func(topic)
+    issue_title = next(
+        (issue["title"] for issue in get_known_issues.func()["issues"] if issue["id"] == known_issue_id),
+        ""
+    )
+    name = get_customer_profile.func(customer_id)["name"]
+    response = template.format(
+        name="there" if name == "Unknown Customer" else name,
+        steps="\n".join(f"{i}. {step}" for i, step in enumerate(solution["steps"], 1)),
+        estimated_time=solution["estimated_time"],
+        issue_title=issue_title,
+    )
+    return key, response.strip()